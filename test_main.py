@@ -1,27 +1,32 @@
 import pytest
 from fastapi.testclient import TestClient
 from main import app, init_db
-import sqlite3
-import os
 
-# Use a separate test database
-TEST_DATABASE = "test_todo.db"
+# Shared-cache in-memory database: no disk I/O or fsyncs during tests.
+# It lives as long as at least one connection is open, which the pool
+# guarantees for the duration of a test.
+TEST_DATABASE = "file:test_todo?mode=memory&cache=shared"
 
 @pytest.fixture(scope="function")
 def test_db():
-    """Create a fresh test database for each test"""
-    # Override the database name
+    """Create a fresh in-memory test database for each test"""
+    import database
     import main
-    main.DATABASE = TEST_DATABASE
-    
-    # Initialize the database
+    database.DATABASE = TEST_DATABASE
+
+    # Start from a clean slate: no pooled connections to a previous test's
+    # database and no cached list responses
+    database._drain_pool()
+    main._LIST_CACHE.clear()
+    main._bump_db_version()
+
+    # Initialize the database (the pooled connection keeps it alive)
     init_db()
-    
+
     yield
-    
-    # Cleanup: remove the test database after each test
-    if os.path.exists(TEST_DATABASE):
-        os.remove(TEST_DATABASE)
+
+    # Closing every connection discards the in-memory database
+    database._drain_pool()
 
 @pytest.fixture
 def client(test_db):
@@ -45,6 +50,24 @@ def test_create_task(client):
     assert data["due_date"] == "2023-12-31"
     assert "id" in data
 
+def test_create_tasks_bulk(client):
+    """Test creating several tasks in one request"""
+    response = client.post("/api/tasks/bulk", json=[
+        {"title": "Bulk Task 1"},
+        {"title": "Bulk Task 2", "status": "Completed"},
+        {"title": "Bulk Task 3", "description": "Third"}
+    ])
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 3
+    assert data["last_id"] - data["first_id"] == 2
+
+    # All three should be retrievable
+    titles = [t["title"] for t in client.get("/api/tasks").json()]
+    for title in ("Bulk Task 1", "Bulk Task 2", "Bulk Task 3"):
+        assert title in titles
+
 def test_read_tasks(client):
     """Test retrieving all tasks"""
     # Create a task first
@@ -61,6 +84,25 @@ def test_read_tasks(client):
     assert len(data) >= 1
     assert data[0]["title"] == "Test Task 1"
 
+def test_read_tasks_pagination(client):
+    """Test limit/after_id keyset pagination"""
+    ids = [
+        client.post("/api/tasks", json={"title": f"Page Task {i}"}).json()["id"]
+        for i in range(3)
+    ]
+
+    # First page: the two newest tasks
+    page = client.get("/api/tasks", params={"limit": 2}).json()
+    assert len(page) == 2
+    assert page[0]["id"] == ids[2]
+
+    # Next page starts after the last id of the previous one
+    next_page = client.get(
+        "/api/tasks", params={"limit": 2, "after_id": page[-1]["id"]}
+    ).json()
+    assert next_page
+    assert next_page[0]["id"] == ids[0]
+
 def test_get_single_task(client):
     """Test retrieving a single task"""
     # Create a task
@@ -77,6 +119,21 @@ def test_get_single_task(client):
     assert data["id"] == task_id
     assert data["title"] == "Single Task"
 
+def test_get_single_task_etag(client):
+    """Test conditional GET with If-None-Match"""
+    task_id = client.post("/api/tasks", json={"title": "Cached Task"}).json()["id"]
+
+    response = client.get(f"/api/tasks/{task_id}")
+    etag = response.headers["etag"]
+    assert etag
+
+    # A matching ETag short-circuits to 304 with no body
+    conditional = client.get(
+        f"/api/tasks/{task_id}", headers={"If-None-Match": etag}
+    )
+    assert conditional.status_code == 304
+    assert not conditional.content
+
 def test_update_task_status(client):
     """Test updating task status"""
     # Create a task
@@ -119,4 +176,19 @@ def test_task_not_found(client):
 def test_delete_nonexistent_task(client):
     """Test deleting non-existent task"""
     response = client.delete("/api/tasks/9999")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_metrics(client, monkeypatch):
+    """Test the database metrics endpoint and its token gate"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["page_count"] > 0
+    assert data["pool"]["max_connections"] == 8
+
+    # With METRICS_TOKEN set, the matching header is required
+    monkeypatch.setenv("METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 403
+    assert client.get(
+        "/metrics", headers={"X-Metrics-Token": "secret"}
+    ).status_code == 200
\ No newline at end of file